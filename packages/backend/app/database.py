@@ -88,6 +88,12 @@ def init_db():
     for attempt in range(max_retries):
         try:
             Base.metadata.create_all(bind=engine)
+
+            # create_all skips tables that already exist, so add any missing indexes
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+
             print("✅ Database tables created successfully!")
             return
         except Exception as e:
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from app.database import init_db, engine
+from app.profiling import ProfilingMiddleware
 from app.routers import auth, profile, label
 from sqlalchemy import text
 
@@ -28,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (see app/profiling.py)
+app.add_middleware(ProfilingMiddleware)
+
 # Mount static files
 try:
     app.mount("/static", StaticFiles(directory="static"), name="static")
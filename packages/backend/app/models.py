@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, BigInteger, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, Integer, BigInteger, Text, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -22,6 +22,10 @@ class AudioFile(Base):
 
 class Label(Base):
     __tablename__ = "labels"
+    __table_args__ = (
+        # Backs keyset pagination of a wallet's label history
+        Index("ix_labels_owner_wallet_created_at_id", "owner_wallet", "created_at", "id"),
+    )
     
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     owner_wallet = Column(Text, ForeignKey("users.wallet_address"), nullable=False)
@@ -0,0 +1,254 @@
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+
+load_dotenv()
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting, treating a blank value as unset"""
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+def _env_int(name: str, default: int) -> int:
+    """Read an int setting, treating a blank value as unset"""
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+# Profiling Configuration
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR") or "profiles"
+PROFILE_INTERVAL_SECONDS = _env_float("PROFILE_INTERVAL_MS", 5.0) / 1000
+PROFILE_MAX_FILES = _env_int("PROFILE_MAX_FILES", 200)
+PROFILE_MAX_CONCURRENT = _env_int("PROFILE_MAX_CONCURRENT", 2)
+PROFILE_HEADER = b"x-profile-token"
+
+# Long-lived streams would keep a sampler thread alive for the whole connection
+STREAMING_MEDIA_TYPES = (b"text/event-stream",)
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+_NULL_SPAN = nullcontext()
+
+
+class RequestProfile:
+    """
+    Span timings and stack samples collected for a single request
+    A background thread samples the event loop thread serving the request and
+    tags each sample with the currently open spans
+    """
+
+    def __init__(self, name: str, thread_id: int, expose_timing: bool):
+        self.name = name
+        self.thread_id = thread_id
+        self.expose_timing = expose_timing
+        self.span_stack: List[str] = []
+        self.span_totals: Dict[str, float] = {}
+        self.samples: Counter = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.active = False
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.active = True
+        self._sampler.start()
+
+    def stop(self):
+        """Signal the sampler to stop (non-blocking, safe to call on the event loop)"""
+        self.duration = time.perf_counter() - self.started_at
+        self.active = False
+        self._stop_event.set()
+
+    def close(self, output_dir: Optional[str]):
+        """Wait for the sampler thread, then dump the profile unless output_dir is None"""
+        self._sampler.join()
+        if output_dir is not None:
+            self.dump(output_dir)
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(PROFILE_INTERVAL_SECONDS):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            frames.reverse()
+
+            self.samples[";".join([self.name, *tuple(self.span_stack), *frames])] += 1
+
+    def record_span(self, name: str, elapsed: float):
+        self.span_totals[name] = self.span_totals.get(name, 0.0) + elapsed
+
+    def server_timing(self) -> str:
+        """Span breakdown formatted as a Server-Timing header value (milliseconds)"""
+        entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in self.span_totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def dump(self, output_dir: str) -> str:
+        """Write samples in collapsed-stack format (flamegraph.pl / speedscope compatible)"""
+        os.makedirs(output_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", self.name).strip("_")
+        # Timestamp first so files sort by age; the suffix keeps concurrent dumps apart
+        path = os.path.join(output_dir, f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}-{slug}.folded")
+
+        with open(path, "w") as f:
+            for stack, count in self.samples.items():
+                f.write(f"{stack} {count}\n")
+
+        _prune_profiles(output_dir, PROFILE_MAX_FILES)
+
+        spans = ", ".join(f"{name}={elapsed * 1000:.2f}ms" for name, elapsed in self.span_totals.items())
+        print(f"🔬 Profiled {self.name} in {self.duration * 1000:.2f}ms [{spans}] -> {path}")
+        return path
+
+
+def _prune_profiles(output_dir: str, max_files: int):
+    """Delete the oldest .folded files so at most max_files are kept (0 keeps all)"""
+    if max_files <= 0:
+        return
+
+    files = sorted(
+        name for name in os.listdir(output_dir) if name.endswith(".folded")
+    )
+    for name in files[:-max_files]:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except OSError:
+            pass
+
+
+@contextmanager
+def _profiled_span(profile: RequestProfile, name: str):
+    profile.span_stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.span_stack.pop()
+        profile.record_span(name, time.perf_counter() - start)
+
+
+def span(name: str):
+    """
+    Time a named section of the current request (e.g. "db", "rpc")
+    Returns a shared no-op context manager when the request is not being profiled
+    """
+    profile = _current_profile.get()
+    if profile is None or not profile.active:
+        return _NULL_SPAN
+    return _profiled_span(profile, name)
+
+
+def _profile_mode(scope) -> Optional[str]:
+    """Return "admin" or "sampled" if this request should be profiled, else None"""
+    if PROFILE_ADMIN_TOKEN:
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER and hmac.compare_digest(value, PROFILE_ADMIN_TOKEN.encode()):
+                return "admin"
+
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def _is_async_route(scope) -> bool:
+    """
+    Check if the matched endpoint runs on the event loop
+    Sync endpoints run in the threadpool, where the loop sampler can't see them
+    """
+    app = scope.get("app")
+    if app is None:
+        return False
+
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return asyncio.iscoroutinefunction(getattr(route, "endpoint", None))
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a request to an async endpoint when the admin
+    header matches PROFILE_ADMIN_TOKEN or when it is picked by PROFILE_SAMPLE_RATE
+    At most PROFILE_MAX_CONCURRENT requests are profiled at once and streaming
+    responses are dropped; everything else is passed straight through to the app
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active_profiles = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = _profile_mode(scope)
+        if (
+            mode is None
+            or self._active_profiles >= PROFILE_MAX_CONCURRENT
+            or not _is_async_route(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        self._active_profiles += 1
+        profile = RequestProfile(
+            f"{scope['method']} {scope['path']}",
+            threading.get_ident(),
+            expose_timing=(mode == "admin")
+        )
+
+        async def finish(dump: bool = True):
+            if not profile.active:
+                return
+            profile.stop()
+            try:
+                await run_in_threadpool(profile.close, PROFILE_OUTPUT_DIR if dump else None)
+            finally:
+                self._active_profiles -= 1
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = dict(headers).get(b"content-type", b"")
+                if content_type.startswith(STREAMING_MEDIA_TYPES):
+                    await finish(dump=False)
+                elif profile.expose_timing:
+                    headers.append((b"server-timing", profile.server_timing().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+            # Stop at the last body chunk so background tasks run after the
+            # response are not counted towards this request
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                await finish()
+
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            await finish()
+            _current_profile.reset(token)
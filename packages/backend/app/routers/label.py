@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, tuple_
 from app.database import get_db
 from app.models import AudioFile, Label
-from app.schemas import AudioResponse, LabelSubmission, LabelResponse
+from app.schemas import (
+    AudioResponse, LabelSubmission, LabelResponse, LabelHistoryItem, LabelHistoryResponse
+)
 from app.routers.auth import verify_token
+from app.profiling import span
 from app.services.solana_service import solana_service
+from app.services.label_events import label_event_hub, format_sse, HEARTBEAT_INTERVAL_SECONDS
+import base64
+import json
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/api", tags=["Labeling"])
 
@@ -44,20 +53,99 @@ def get_next_audio(
         duration_seconds=audio.duration_seconds
     )
 
+def _encode_cursor(created_at: datetime, label_id: int) -> str:
+    """Pack the (created_at, id) position of the last row into an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), label_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, label_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise invalid_cursor
+
+    # Label ids are BigInteger, so reject anything Postgres couldn't compare against
+    if not isinstance(created_at, str) or type(label_id) is not int or not 0 < label_id < 2**63:
+        raise invalid_cursor
+
+    try:
+        return datetime.fromisoformat(created_at), label_id
+    except ValueError:
+        raise invalid_cursor
+
+@router.get("/labels/me", response_model=LabelHistoryResponse)
+def get_label_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, description="Page size, capped at 100"),
+    wallet_address: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """
+    Get current user's submitted labels, newest first
+    Uses keyset pagination on (created_at, id) so deep pages cost the same as the first
+    Pass next_cursor from the previous page to continue
+    Labels without a created_at can't be placed in the ordering and are left out
+    """
+    limit = min(limit, 100)
+
+    # Select only the listed columns so rows come back as tuples, not Label objects
+    query = db.query(
+        Label.id, Label.audio_id, Label.transaction_hash, Label.created_at
+    ).filter(
+        Label.owner_wallet == wallet_address,
+        Label.created_at.isnot(None)
+    )
+
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(
+            tuple_(Label.created_at, Label.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Label.created_at.desc(), Label.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return LabelHistoryResponse(
+        items=[
+            LabelHistoryItem(
+                id=row.id,
+                audio_id=row.audio_id,
+                transaction_hash=row.transaction_hash,
+                created_at=row.created_at
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor
+    )
+
 @router.post("/labels", response_model=LabelResponse)
 async def submit_label(
     label: LabelSubmission,
+    background_tasks: BackgroundTasks,
     wallet_address: str = Depends(verify_token),
     db: Session = Depends(get_db)
 ):
     """
     Submit a label for an audio file
     Validates, calls the on-chain program, then saves to database
+    Lifecycle events are pushed to the wallet's /api/labels/stream connections
     """
     
     # --- 1. Validation (เหมือนเดิม) ---
     # Check if audio file exists
-    audio = db.query(AudioFile).filter(AudioFile.id == label.audio_id).first()
+    with span("db"):
+        audio = db.query(AudioFile).filter(AudioFile.id == label.audio_id).first()
     if not audio:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,34 +153,37 @@ async def submit_label(
         )
     
     # Check if user has already labeled this audio
-    existing_label = db.query(Label).filter(
-        and_(
-            Label.owner_wallet == wallet_address,
-            Label.audio_id == label.audio_id
-        )
-    ).first()
+    with span("db"):
+        existing_label = db.query(Label).filter(
+            and_(
+                Label.owner_wallet == wallet_address,
+                Label.audio_id == label.audio_id
+            )
+        ).first()
     
     if existing_label:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already labeled this audio file"
         )
-    
+
     # --- 💡 2. เรียก Smart Contract ก่อน ---
     try:
-        audio = db.query(AudioFile).filter(AudioFile.id == label.audio_id).first()
+        with span("db"):
+            audio = db.query(AudioFile).filter(AudioFile.id == label.audio_id).first()
         if not audio:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Audio file with id {label.audio_id} not found"
             )
 
-        existing_label = db.query(Label).filter(
-            and_(
-                Label.owner_wallet == wallet_address,
-                Label.audio_id == label.audio_id
-            )
-        ).first()
+        with span("db"):
+            existing_label = db.query(Label).filter(
+                and_(
+                    Label.owner_wallet == wallet_address,
+                    Label.audio_id == label.audio_id
+                )
+            ).first()
 
         if existing_label:
             raise HTTPException(
@@ -100,6 +191,8 @@ async def submit_label(
                 detail="You have already labeled this audio file"
             )
 
+        label_event_hub.publish(wallet_address, "accepted", audio_id=label.audio_id)
+
         tx_signature = await solana_service.record_label_on_chain(
             user_wallet=wallet_address,
             label_data=label.dict()
@@ -107,6 +200,10 @@ async def submit_label(
 
         if not tx_signature:
             # ถ้า solana_service คืนค่า None (แปลว่าล้มเหลว)
+            label_event_hub.publish(
+                wallet_address, "failed", audio_id=label.audio_id,
+                error="Service returned no signature"
+            )
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to record label on-chain. Service returned no signature."
@@ -114,6 +211,11 @@ async def submit_label(
             
     except Exception as e:
         # ดักจับ Error อื่นๆ จาก solana_service (เช่น RPC down)
+        # Validation errors raised above are not chain failures, so they are not published
+        if not isinstance(e, HTTPException):
+            label_event_hub.publish(
+                wallet_address, "failed", audio_id=label.audio_id, error=str(e)
+            )
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Error communicating with Solana: {str(e)}"
@@ -131,12 +233,101 @@ async def submit_label(
         transaction_hash=tx_signature  
     )
     
-    db.add(new_label)
-    db.commit()
-    db.refresh(new_label)
+    try:
+        with span("db"):
+            db.add(new_label)
+            db.commit()
+            db.refresh(new_label)
+    except Exception as e:
+        db.rollback()
+        label_event_hub.publish(
+            wallet_address, "failed", audio_id=label.audio_id,
+            transaction_hash=tx_signature, error=str(e)
+        )
+        raise
+
+    label_id = new_label.id
+    label_event_hub.publish(
+        wallet_address, "sent", audio_id=label.audio_id,
+        label_id=label_id, transaction_hash=tx_signature
+    )
+
+    # Only pay for the counter query and confirmation polling when someone is listening
+    if label_event_hub.has_subscribers(wallet_address):
+        with span("db"):
+            labels_count = db.query(func.count(Label.id)).filter(
+                Label.owner_wallet == wallet_address
+            ).scalar()
+        label_event_hub.publish(wallet_address, "progress", labels_count=labels_count)
+        background_tasks.add_task(
+            _publish_confirmation, wallet_address, label.audio_id, label_id, tx_signature
+        )
+
+    # get_db only closes after background tasks finish, so hand the connection
+    # back to the pool now instead of holding it through the confirmation wait
+    db.close()
     
     return LabelResponse(
         status="success",
-        label_id=new_label.id,
+        label_id=label_id,
         transaction_signature=tx_signature
     )
+
+async def _publish_confirmation(
+    wallet_address: str,
+    audio_id: int,
+    label_id: int,
+    tx_signature: str
+):
+    """
+    Background task: wait for the label transaction and push the outcome
+    A timeout or RPC error is reported as unconfirmed, since the transaction may still land
+    """
+    confirmed = await solana_service.confirm_label_transaction(tx_signature)
+    if confirmed is None:
+        event_type = "unconfirmed"
+    else:
+        event_type = "confirmed" if confirmed else "failed"
+
+    label_event_hub.publish(
+        wallet_address,
+        event_type,
+        audio_id=audio_id,
+        label_id=label_id,
+        transaction_hash=tx_signature
+    )
+
+@router.get("/labels/stream")
+async def stream_label_events(
+    request: Request,
+    wallet_address: str = Depends(verify_token)
+):
+    """
+    Server-sent events stream of label lifecycle events for the current user
+    Pushes accepted, sent, confirmed, unconfirmed, failed and progress events
+    Sends a heartbeat comment when idle so dead connections get cleaned up
+    """
+    subscription = label_event_hub.subscribe(wallet_address)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                event = await subscription.next_event(timeout=HEARTBEAT_INTERVAL_SECONDS)
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            label_event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
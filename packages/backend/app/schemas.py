@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, List
+from datetime import datetime
 
 # Authentication Schemas
 class LoginRequest(BaseModel):
@@ -46,4 +47,14 @@ class LabelSubmission(BaseModel):
 class LabelResponse(BaseModel):
     status: str = "success"
     label_id: int
-    transaction_signature: Optional[str] = None
\ No newline at end of file
+    transaction_signature: Optional[str] = None
+
+class LabelHistoryItem(BaseModel):
+    id: int
+    audio_id: int
+    transaction_hash: Optional[str]
+    created_at: datetime
+
+class LabelHistoryResponse(BaseModel):
+    items: List[LabelHistoryItem]
+    next_cursor: Optional[str] = None
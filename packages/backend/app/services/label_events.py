@@ -0,0 +1,79 @@
+import asyncio
+import json
+from typing import Dict, Optional, Set
+
+# Max events buffered per connection before the oldest ones are dropped
+SUBSCRIBER_BUFFER_SIZE = 32
+# Seconds of silence before a heartbeat comment is written to the stream
+HEARTBEAT_INTERVAL_SECONDS = 15
+
+
+class LabelSubscription:
+    """A single connected client listening for one wallet's label events"""
+
+    def __init__(self, wallet_address: str, buffer_size: int = SUBSCRIBER_BUFFER_SIZE):
+        self.wallet_address = wallet_address
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+    def push(self, event: dict):
+        """Enqueue an event without blocking, dropping the oldest one if the buffer is full"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        """Wait for the next event, returning None if nothing arrives within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LabelEventHub:
+    """
+    In-process fan-out of label lifecycle events to connected wallets
+    Each connection gets its own bounded buffer so a slow client never blocks publishers
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[LabelSubscription]] = {}
+
+    def subscribe(self, wallet_address: str) -> LabelSubscription:
+        """Register a new connection for a wallet"""
+        subscription = LabelSubscription(wallet_address)
+        self._subscribers.setdefault(wallet_address, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LabelSubscription):
+        """Remove a connection, dropping the wallet entry once it has no listeners"""
+        subscribers = self._subscribers.get(subscription.wallet_address)
+        if not subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.wallet_address]
+
+    def has_subscribers(self, wallet_address: str) -> bool:
+        """Check if any connection is listening for this wallet"""
+        return wallet_address in self._subscribers
+
+    def publish(self, wallet_address: str, event_type: str, **data):
+        """Push an event to every connection of a wallet (no-op if nobody is listening)"""
+        subscribers = self._subscribers.get(wallet_address)
+        if not subscribers:
+            return
+        event = {"type": event_type, **data}
+        for subscription in list(subscribers):
+            subscription.push(event)
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event as a server-sent events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+# Global instance
+label_event_hub = LabelEventHub()
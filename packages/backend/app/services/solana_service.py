@@ -7,6 +7,7 @@ from typing import Optional
 from solana.rpc.async_api import AsyncClient
 from solders.pubkey import Pubkey
 from solders.keypair import Keypair
+from solders.signature import Signature
 from solders.transaction import VersionedTransaction
 from solders.instruction import Instruction, AccountMeta
 from solders.hash import Hash
@@ -14,6 +15,7 @@ from solders.message import Message
 from dotenv import load_dotenv
 from solana.rpc.types import TxOpts
 from solana.rpc.commitment import Confirmed
+from app.profiling import span
 
 print("Solders version:", pkg_resources.get_distribution("solders").version)
 print("Solana version:", pkg_resources.get_distribution("solana").version)
@@ -70,42 +72,48 @@ class SolanaService:
                 return None
 
             user_pubkey = Pubkey.from_string(user_wallet)
-            label_hash = self.generate_label_hash(label_data)
-            user_stats_pda, _ = self.derive_user_stats_pda(user_pubkey)
+            with span("hashing"):
+                label_hash = self.generate_label_hash(label_data)
+            with span("pda"):
+                user_stats_pda, _ = self.derive_user_stats_pda(user_pubkey)
 
             # ✅ Build instruction
-            instruction_data = struct.pack('B', 0) + label_hash + struct.pack('<Q', label_data['audio_id'])
-
-            instruction = Instruction(
-                program_id=self.program_id,
-                data=instruction_data,
-                accounts=[
-                    AccountMeta(pubkey=self.treasury.pubkey(), is_signer=True, is_writable=True),
-                    AccountMeta(pubkey=user_stats_pda, is_signer=False, is_writable=True),
-                    AccountMeta(pubkey=Pubkey.from_string("11111111111111111111111111111111"), is_signer=False, is_writable=False),
-                    AccountMeta(pubkey=Pubkey.from_string("SysvarC1ock11111111111111111111111111111111"), is_signer=False, is_writable=False),
-                ]
-            )
-
-            recent_blockhash_resp = await self.client.get_latest_blockhash()
+            with span("serialization"):
+                instruction_data = struct.pack('B', 0) + label_hash + struct.pack('<Q', label_data['audio_id'])
+
+                instruction = Instruction(
+                    program_id=self.program_id,
+                    data=instruction_data,
+                    accounts=[
+                        AccountMeta(pubkey=self.treasury.pubkey(), is_signer=True, is_writable=True),
+                        AccountMeta(pubkey=user_stats_pda, is_signer=False, is_writable=True),
+                        AccountMeta(pubkey=Pubkey.from_string("11111111111111111111111111111111"), is_signer=False, is_writable=False),
+                        AccountMeta(pubkey=Pubkey.from_string("SysvarC1ock11111111111111111111111111111111"), is_signer=False, is_writable=False),
+                    ]
+                )
+
+            with span("rpc"):
+                recent_blockhash_resp = await self.client.get_latest_blockhash()
             recent_blockhash = Hash.from_string(str(recent_blockhash_resp.value.blockhash))
 
-            message = Message.new_with_blockhash(
-                [instruction],
-                self.treasury.pubkey(),
-                recent_blockhash
-            )
-            transaction = VersionedTransaction(message=message,keypairs=[self.treasury] )
+            with span("serialization"):
+                message = Message.new_with_blockhash(
+                    [instruction],
+                    self.treasury.pubkey(),
+                    recent_blockhash
+                )
+                transaction = VersionedTransaction(message=message,keypairs=[self.treasury] )
 
             opts = TxOpts(
               skip_preflight=True,
               preflight_commitment=Confirmed  
             )
 
-            response = await self.client.send_transaction(
-              transaction,
-              opts=opts  
-            )
+            with span("rpc"):
+                response = await self.client.send_transaction(
+                  transaction,
+                  opts=opts  
+                )
 
             signature = response.value
             print(f"✅ Label recorded on-chain: {signature}")
@@ -116,6 +124,25 @@ class SolanaService:
             print(f"❌ Error recording label on-chain: {e}")
             return None
 
+    async def confirm_label_transaction(self, signature: str) -> Optional[bool]:
+        """
+        Wait until a sent label transaction is confirmed
+        Returns False if it landed with an error, None if its outcome is unknown (timeout or RPC error)
+        """
+        try:
+            response = await self.client.confirm_transaction(
+                Signature.from_string(signature),
+                commitment=Confirmed
+            )
+            tx_status = response.value[0]
+            if tx_status is None:
+                return None
+            return tx_status.err is None
+
+        except Exception as e:
+            print(f"⚠️  Could not confirm transaction {signature}: {e}")
+            return None
+
     async def close(self):
         """Close the RPC client"""
         await self.client.close()